@@ -13,12 +13,19 @@
 # =============================================================================
 
 import streamlit as st
+import matplotlib
+# Backend no interactivo antes de importar pyplot: sin GUI ni modo
+# interactivo que redibuje por cada llamada bajo sesiones concurrentes
+matplotlib.use('Agg', force=True)
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+plt.ioff()
 import numpy as np
 import pandas as pd
-from scipy.signal import find_peaks
-from scipy.interpolate import make_interp_spline
+import pyarrow as pa
 from google.cloud import bigquery
+import functools
 import gettext
 import locale
 import os
@@ -26,6 +33,20 @@ import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+# Numba es opcional: si no está instalado, los kernels corren como Python puro
+try:
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        def decorator(func):
+            return func
+        return decorator
+
 # Importar estilos compartidos
 try:
     # Intentar desde directorio padre (desarrollo local)
@@ -56,32 +77,39 @@ apply_standard_styles()
 # CONFIGURACIÓN DE GETTEXT
 # =============================================================================
 
-def get_translation_function():
-    """Obtener función de traducción según idioma"""
-    
+# Idioma del sistema detectado una sola vez al importar:
+# locale.getdefaultlocale es lento en algunas plataformas y no cambia en vivo
+try:
+    _SYSTEM_LANG = (locale.getdefaultlocale()[0] or "en")[:2]
+except:
+    _SYSTEM_LANG = "en"  # Fallback a inglés
+
+def get_current_lang():
+    """Detectar el idioma activo (parámetro URL o idioma del sistema)"""
+
     # Detectar idioma del navegador o parámetro URL
     lang = st.query_params.get("lang", None)
-    
-    # Si no hay parámetro URL, detectar idioma del sistema
+
+    # Si no hay parámetro URL, usar el idioma del sistema ya detectado
     if lang is None:
-        try:
-            system_lang = locale.getdefaultlocale()[0][:2]
-            if system_lang in ["es", "en"]:
-                lang = system_lang
-            else:
-                lang = "en"  # Fallback a inglés
-        except:
-            lang = "en"  # Fallback a inglés
-    
-    # Configurar GETTEXT
+        lang = _SYSTEM_LANG if _SYSTEM_LANG in ["es", "en"] else "en"
+
+    return lang
+
+@functools.lru_cache(maxsize=8)
+def _translator(lang):
+    """Función de traducción por idioma: el .mo se parsea una sola vez"""
+    return gettext.translation(
+        'messages',
+        'locales',
+        languages=[lang],
+        fallback=True
+    ).gettext
+
+def get_translation_function():
+    """Obtener función de traducción según idioma"""
     try:
-        translation = gettext.translation(
-            'messages', 
-            'locales', 
-            languages=[lang],
-            fallback=True
-        )
-        return translation.gettext
+        return _translator(get_current_lang())
     except Exception as e:
         st.warning(f"Translation error: {e}. Using English.")
         return lambda x: x
@@ -90,20 +118,63 @@ def get_translation_function():
 def _(text):
     return get_translation_function()(text)
 
+# Claves gettext de los nombres de mes (el texto mostrado sale de la traducción)
+_MONTH_KEYS = ("January", "February", "March", "April", "May", "June",
+               "July", "August", "September", "October", "November", "December")
+
+@st.cache_data
+def get_month_names(lang):
+    """
+    Nombres de mes traducidos, construidos una sola vez por idioma.
+
+    El parámetro lang es la clave de cache: evita repetir los 12 lookups de
+    gettext en cada rerun de main().
+    """
+    translate = get_translation_function()
+    return [translate(month) for month in _MONTH_KEYS]
+
+# Paleta RGBA precalculada para colorear puntos por año (ciclo de 10 colores).
+# Una sola indexación numpy reemplaza la construcción de strings 'C{n}' por punto.
+_PALETTE = np.array([matplotlib.colors.to_rgba(f'C{i}') for i in range(10)], dtype=np.float32)
+
+# Abreviaturas de mes para ejes y encabezados de tabla (no se traducen),
+# compartidas por los tres constructores de gráficos/tablas
+MONTH_NAMES_SHORT = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                     'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# Estilos de anotación inmutables: construidos una sola vez en lugar de
+# un dict nuevo por cada pico/valle anotado
+_PEAK_BBOX = dict(boxstyle='round,pad=0.4', facecolor='lightgreen', alpha=0.8, edgecolor='darkgreen', linewidth=1.5)
+_VALLEY_BBOX = dict(boxstyle='round,pad=0.4', facecolor='lightcoral', alpha=0.8, edgecolor='darkred', linewidth=1.5)
+
 # =============================================================================
 # FUNCIONES BASE (copiadas de base_functions_notebook.py)
 # =============================================================================
 
-@st.cache_data(ttl=3600)  # Cache por 1 hora (3600 segundos)
+@st.cache_resource
+def get_bigquery_client():
+    """
+    Cliente de BigQuery compartido entre sesiones.
+
+    Los objetos tipo conexión van en cache_resource: el handshake de auth y
+    discovery se paga una sola vez, incluso si los caches de datos expiran.
+    """
+    return bigquery.Client()
+
+@st.cache_data(ttl=3600, show_spinner=False)  # Cache por 1 hora (3600 segundos)
 def get_calls_info(PROJECT="pph-central"):
     """
     Extrae información consolidada de llamadas de ServiceTitan desde BigQuery.
-    
+
+    Descarga el resultado por el camino columnar de Arrow (to_arrow) en lugar
+    de la conversión fila a fila de to_dataframe, y materializa pandas una
+    sola vez sobre los buffers columnares.
+
     Args:
         PROJECT: Proyecto de BigQuery a usar ('pph-central' o 'pph-inbox')
     """
     try:
-        client = bigquery.Client()
+        client = get_bigquery_client()
         
         query = f"""
            SELECT c.company_id AS `company_id`
@@ -122,74 +193,330 @@ def get_calls_info(PROJECT="pph-central"):
             ORDER BY c.company_id, cl.location_state, EXTRACT(YEAR FROM DATE(cl.lead_call_created_on)), EXTRACT(MONTH FROM DATE(cl.lead_call_created_on))
         """
         
+        # client.query no bloquea: mientras BigQuery ejecuta del lado remoto,
+        # adelantar trabajo local (cache de traducciones y warmup del kernel)
+        # antes de bloquear en el resultado
         query_job = client.query(query)
-        results = query_job.result()
-        
-        calls_df = pd.DataFrame(results.to_dataframe())
+
+        get_month_names(get_current_lang())
+        _detect_peaks_valleys(np.zeros(12), 2)
+
+        arrow_table = query_job.to_arrow(create_bqstorage_client=True)
+
+        calls_df = arrow_table.to_pandas()
+
+        # Tipos compactos: category compara/agrupa sobre códigos enteros en
+        # lugar de hashear strings, y los enteros angostos reducen el tamaño
+        # del frame cacheado
+        for column in ("state", "company_name", "company_id"):
+            calls_df[column] = calls_df[column].astype("category")
+        for column in ("year", "month", "calls"):
+            calls_df[column] = pd.to_numeric(calls_df[column], downcast="integer")
+
         return calls_df
         
     except Exception as e:
         st.error(f"❌ {_('Error loading data. Check BigQuery connection.')}: {str(e)}")
         return None
 
-def calculate_monthly_percentages(calls_df, company_id):
+@st.cache_data(ttl=3600)  # Cache por 1 hora (3600 segundos)
+def get_company_slices(PROJECT="pph-central"):
     """
-    Calcula el porcentaje de llamadas por mes para una compañía específica.
+    Columnas (year, month, calls) ordenadas por compañía + rangos por compañía.
+
+    Ordenar una sola vez deja las filas de cada compañía contiguas: el recorte
+    por compañía es un slice de arrays columnares (amigable al cache de CPU)
+    en lugar de un gather disperso o una máscara booleana sobre todo el frame.
     """
-    # Filtrar datos de la compañía
-    company_data = calls_df[calls_df['company_id'] == company_id].copy()
-    
-    if company_data.empty:
-        return None, None, None
-    
-    # Agrupar por mes y sumar llamadas
-    monthly_totals = company_data.groupby('month')['calls'].sum()
-    
-    # Crear array completo para los 12 meses
-    monthly_calls = np.zeros(12)
-    for month, calls in monthly_totals.items():
-        monthly_calls[month - 1] = calls  # month es 1-12, array es 0-11
-    
-    # Calcular total y porcentajes
-    total_calls = np.sum(monthly_calls)
-    monthly_percentages = (monthly_calls / total_calls) * 100 if total_calls > 0 else np.zeros(12)
-    
-    return monthly_calls, monthly_percentages, total_calls
+    calls_df = get_calls_info(PROJECT=PROJECT)
+
+    if calls_df is None:
+        return None
+
+    sorted_df = calls_df.sort_values('company_id', kind='stable')
+    ids_arr = sorted_df['company_id'].to_numpy()
+    unique_ids, starts = np.unique(ids_arr, return_index=True)
+    bounds = np.append(starts, len(ids_arr))
+
+    arrays = {
+        'year': np.ascontiguousarray(sorted_df['year'].to_numpy()),
+        'month': np.ascontiguousarray(sorted_df['month'].to_numpy(dtype=np.int8)),
+        'calls': np.ascontiguousarray(sorted_df['calls'].to_numpy(dtype=np.float64))
+    }
+    slices = {company_id: (int(bounds[k]), int(bounds[k + 1]))
+              for k, company_id in enumerate(unique_ids)}
+
+    return arrays, slices
+
+@st.cache_data(ttl=3600)  # Cache por 1 hora (3600 segundos)
+def get_company_summary(PROJECT="pph-central"):
+    """
+    Resumen por compañía (total, rango de años y estados) en un solo groupby.
+
+    La información del sidebar pasa de varios escaneos del subframe por rerun
+    a un lookup de una fila: sum, min, max y unique se calculan en la misma
+    pasada sobre las filas de cada compañía.
+    """
+    calls_df = get_calls_info(PROJECT=PROJECT)
+
+    if calls_df is None:
+        return None
+
+    return calls_df.groupby('company_id', observed=True).agg(
+        total_calls=('calls', 'sum'),
+        year_min=('year', 'min'),
+        year_max=('year', 'max'),
+        states=('state', 'unique')
+    )
+
+@st.cache_data(ttl=3600)  # Cache por 1 hora (3600 segundos)
+def get_sidebar_company_info(PROJECT="pph-central", company_id=None):
+    """
+    Bloque markdown con la información compacta de una compañía.
+
+    Memoizar el string formateado deja el sidebar en un solo markdown por
+    rerun en lugar de varios captions re-formateados en cada selección.
+    """
+    summary_row = get_company_summary(PROJECT=PROJECT).loc[company_id]
+    total_calls_company = int(summary_row['total_calls'])
+    years_range = f"{summary_row['year_min']}-{summary_row['year_max']}"
+    states_company = ', '.join(sorted(map(str, summary_row['states'])))
+
+    return (f"📊 ID: {company_id}  \n"
+            f"📅 {years_range}  \n"
+            f"📞 {total_calls_company:,} calls  \n"
+            f"📍 {states_company}")
+
+@st.cache_data(ttl=3600)  # Cache por 1 hora (3600 segundos)
+def get_companies(PROJECT="pph-central"):
+    """
+    Diccionario company_id -> company_name ordenado por ID.
+
+    El drop_duplicates + sort sobre todo el frame se paga una vez por hora
+    en lugar de en cada rerun del selector.
+    """
+    calls_df = get_calls_info(PROJECT=PROJECT)
+
+    if calls_df is None:
+        return None
+
+    companies_info = calls_df[['company_id', 'company_name']].drop_duplicates().sort_values('company_id')
+    return dict(zip(companies_info['company_id'], companies_info['company_name']))
+
+@st.cache_data(ttl=3600)  # Cache por 1 hora (3600 segundos)
+def get_monthly_calls_by_company(PROJECT="pph-central"):
+    """
+    Extrae totales mensuales por compañía ya agregados en BigQuery.
+
+    BigQuery hace la agregación en columnar y devuelve solo
+    (company_id, month, calls), así el lado Python se reduce a un
+    pivote de 12 elementos por compañía.
+
+    Args:
+        PROJECT: Proyecto de BigQuery a usar ('pph-central' o 'pph-inbox')
+    """
+    try:
+        client = get_bigquery_client()
+
+        query = f"""
+           SELECT cl.company_id AS `company_id`
+                , EXTRACT(MONTH FROM DATE(cl.lead_call_created_on)) AS `month`
+                , COUNT(cl.lead_call_id) AS `calls`
+             FROM `{PROJECT}.analytical.vw_consolidated_call_inbound_location` cl
+            WHERE DATE(cl.lead_call_created_on) < DATE("2025-10-01")
+              AND EXTRACT(YEAR FROM DATE(cl.lead_call_created_on)) >= 2015
+            GROUP BY cl.company_id, EXTRACT(MONTH FROM DATE(cl.lead_call_created_on))
+        """
+
+        query_job = client.query(query)
+        arrow_table = query_job.to_arrow(create_bqstorage_client=True)
+        monthly_df = arrow_table.to_pandas()
+
+        # Mismos tipos compactos que get_calls_info: month cabe en int8 y
+        # calls en el entero más angosto posible
+        for column in ("month", "calls"):
+            monthly_df[column] = pd.to_numeric(monthly_df[column], downcast="integer")
+
+        return monthly_df
+
+    except Exception as e:
+        st.error(f"❌ {_('Error loading data. Check BigQuery connection.')}: {str(e)}")
+        return None
+
+@st.cache_data(ttl=3600)  # Cache por 1 hora (3600 segundos)
+def build_company_index(PROJECT="pph-central"):
+    """
+    Construye un índice company_id -> array de 12 totales mensuales.
+
+    Pivotea una sola vez el resultado de get_monthly_calls_by_company, de modo
+    que cada selección de compañía sea un lookup O(1) de dict en lugar de un
+    filtro por máscara booleana sobre todo el DataFrame.
+    """
+    monthly_df = get_monthly_calls_by_company(PROJECT=PROJECT)
+
+    if monthly_df is None:
+        return None
+
+    # np.bincount sobre las columnas numpy crudas: un solo loop en C por grupo,
+    # sin construir Series intermedias (set_index + reindex)
+    return {
+        company_id: np.bincount(group['month'].to_numpy(dtype=np.intp) - 1,
+                                weights=group['calls'].to_numpy(dtype=np.float64),
+                                minlength=12)
+        for company_id, group in monthly_df.groupby('company_id', sort=False)
+    }
 
 # =============================================================================
 # FUNCIÓN DE ANÁLISIS (adaptada del script original)
 # =============================================================================
 
-def analyze_inflection_points_streamlit(calls_df, company_id, method="Original (find_peaks)"):
+@st.cache_resource(ttl=3600)
+def precompute_all_analyses(PROJECT, method="Original (find_peaks)"):
+    """
+    Precalcula el análisis de todas las compañías en un solo diccionario.
+
+    El kernel por compañía cuesta microsegundos sobre los 12 totales del
+    índice, así que una pasada al arrancar deja cada selección posterior
+    como un lookup de dict sin cómputo ni BigQuery.
+    """
+    company_index = build_company_index(PROJECT=PROJECT)
+
+    if company_index is None:
+        return None
+
+    # Crear array de meses (1-12), compartido por todas las compañías
+    months = np.arange(1, 13)
+
+    # Porcentajes + detección en un solo kernel compilado
+    # (distancia mínima: 2 meses el método original, 3 el híbrido)
+    min_distance = 3 if method == "Hybrid (3-4 months)" else 2
+
+    results = {}
+    for company_id, monthly_calls in company_index.items():
+        calls, peaks, valleys, total_calls = _monthly_stats(monthly_calls, min_distance)
+
+        # Método matemático estricto - quartiles
+        if method == "Mathematical Strict":
+            peaks, valleys = detect_peaks_valleys_quartiles(calls)
+
+        results[company_id] = (months, calls, peaks, valleys, total_calls, monthly_calls)
+
+    return results
+
+def analyze_inflection_points_streamlit(PROJECT, company_id, method="Original (find_peaks)"):
     """
     Analiza los puntos de inflexión para una compañía específica (versión Streamlit)
+
+    Lookup directo sobre el diccionario precalculado: cambiar de compañía
+    no ejecuta detección alguna.
     """
-    # Calcular porcentajes mensuales
-    monthly_calls, monthly_percentages, total_calls = calculate_monthly_percentages(calls_df, company_id)
-    
-    if monthly_percentages is None:
+    all_analyses = precompute_all_analyses(PROJECT, method)
+
+    if all_analyses is None or company_id not in all_analyses:
         return None, None, None, None, None, None
-    
-    # Crear array de meses (1-12)
-    months = np.arange(1, 13)
-    calls = monthly_percentages
-    
-    # Aplicar método de detección seleccionado
-    # Método original - más sensible
-    if method == "Original (find_peaks)":
-        peaks, _ = find_peaks(calls, height=np.mean(calls), distance=2)
-        valleys, _ = find_peaks(-calls, height=-np.mean(calls), distance=2)
 
-    # Método matemático estricto - quartiles        
-    elif method == "Mathematical Strict":
-        peaks, valleys = detect_peaks_valleys_quartiles(calls)
+    return all_analyses[company_id]
 
-    # Método híbrido - distancia mínima de 3-4 meses
-    elif method == "Hybrid (3-4 months)":
-        peaks, _ = find_peaks(calls, height=np.mean(calls), distance=3)
-        valleys, _ = find_peaks(-calls, height=-np.mean(calls), distance=3)
-    
-    return months, calls, peaks, valleys, total_calls, monthly_calls
+@njit(cache=True, nogil=True)
+def _local_peaks(x, height, min_distance):
+    """
+    Réplica compilada de find_peaks(x, height=height, distance=min_distance):
+    máximos locales (mesetas incluidas, reportadas por su punto medio) con
+    umbral de altura, y supresión por distancia en orden descendente de
+    altura, de modo que sobrevive el pico más alto y no el más a la izquierda.
+
+    Los empates de altura se resuelven por posición (el candidato más a la
+    derecha tiene prioridad), una regla fija en lugar del orden que deje el
+    argsort inestable de SciPy.
+    """
+    n = x.shape[0]
+
+    # Candidatos: máximos locales estrictos o mesetas cerradas por ambos lados
+    cand = np.empty(n, np.int64)
+    n_cand = 0
+    i = 1
+    while i < n - 1:
+        if x[i - 1] < x[i]:
+            i_ahead = i + 1
+            while i_ahead < n - 1 and x[i_ahead] == x[i]:
+                i_ahead += 1
+            if x[i_ahead] < x[i]:
+                mid = (i + i_ahead - 1) // 2
+                if x[mid] >= height:
+                    cand[n_cand] = mid
+                    n_cand += 1
+                i = i_ahead
+        i += 1
+
+    # Supresión: del candidato más alto al más bajo, descartar vecinos a
+    # menos de min_distance (mismo orden de prioridad que SciPy). El orden
+    # se construye con un insertion sort estable propio — np.argsort rompe
+    # empates distinto bajo numba que bajo numpy puro — así alturas iguales
+    # se resuelven siempre por posición, idéntico en ambos caminos
+    keep = np.ones(n_cand, np.bool_)
+    order = np.arange(n_cand)
+    for a in range(1, n_cand):
+        j = order[a]
+        b = a - 1
+        while b >= 0 and x[cand[order[b]]] > x[cand[j]]:
+            order[b + 1] = order[b]
+            b -= 1
+        order[b + 1] = j
+    for k in range(n_cand - 1, -1, -1):
+        j = order[k]
+        if not keep[j]:
+            continue
+        m = j - 1
+        while m >= 0 and cand[j] - cand[m] < min_distance:
+            keep[m] = False
+            m -= 1
+        m = j + 1
+        while m < n_cand and cand[m] - cand[j] < min_distance:
+            keep[m] = False
+            m += 1
+
+    return cand[:n_cand][keep]
+
+@njit(cache=True, nogil=True)
+def _detect_peaks_valleys(calls, min_distance):
+    """
+    Detecta picos y valles en el vector de 12 meses con loops compilados.
+
+    Equivale a find_peaks(calls, height=mean, distance=d) y su espejo sobre
+    -calls, pero sin el despacho genérico de SciPy. Única diferencia: entre
+    candidatos de altura empatada el desempate es determinista (ver
+    _local_peaks), donde SciPy hereda el orden de un argsort inestable.
+    """
+    mean = calls.mean()
+    peaks = _local_peaks(calls, mean, min_distance)
+    valleys = _local_peaks(-calls, -mean, min_distance)
+    return peaks, valleys
+
+@njit(cache=True, nogil=True)
+def _monthly_stats(monthly_calls, min_distance):
+    """
+    Calcula porcentajes mensuales y detecta picos/valles en un solo kernel.
+
+    Recibe los 12 totales ya agregados por build_company_index y deja toda la
+    parte numérica del análisis en una pasada compilada que además libera el
+    GIL, así sesiones concurrentes de Streamlit no se serializan aquí.
+    """
+    total_calls = monthly_calls.sum()
+
+    pct = np.zeros(12)
+    if total_calls > 0:
+        for i in range(12):
+            pct[i] = monthly_calls[i] * 100.0 / total_calls
+
+    peaks, valleys = _detect_peaks_valleys(pct, min_distance)
+    return pct, peaks, valleys, total_calls
+
+# Calentar el JIT al importar con vectores dummy del mismo dtype (float64)
+# que producen build_company_index y los porcentajes: la primera petición
+# real no paga la compilación de ningún kernel. Se usan llamadas dummy en
+# lugar de firmas eager porque el shim sin numba no las aceptaría.
+if _NUMBA_AVAILABLE:
+    _monthly_stats(np.zeros(12), 2)
 
 def detect_peaks_valleys_quartiles(calls):
     """
@@ -350,49 +677,52 @@ def optimize_midpoint_marks(pattern_analysis, months, calls, peaks, valleys):
         # Método estándar para otros casos
         return calculate_midpoint_lines(months, calls, peaks, valleys)
 
-def calculate_annual_data(calls_df, company_id, mode="percentages"):
+@st.cache_data(ttl=3600)  # Cache por 1 hora (3600 segundos)
+def calculate_annual_data(PROJECT, company_id, mode="percentages"):
     """
     Calcula datos mensuales por año para una compañía específica.
     Modo: "percentages" o "absolute"
     Retorna una tabla con años en filas y meses en columnas.
+
+    Cacheado por (PROJECT, company_id, mode) para que los reruns de widgets
+    no repitan el filtrado ni la agregación anual.
     """
-    # Filtrar datos de la compañía
-    company_data = calls_df[calls_df['company_id'] == company_id].copy()
-    
-    if company_data.empty:
+    soa = get_company_slices(PROJECT=PROJECT)
+
+    if soa is None:
         return None
-    
-    # Agrupar por año y mes, sumar llamadas
-    yearly_monthly = company_data.groupby(['year', 'month'])['calls'].sum().reset_index()
-    
-    # Crear tabla anual
-    years = sorted(yearly_monthly['year'].unique())
-    months = range(1, 13)
-    
-    # Crear DataFrame para la tabla
-    annual_table = pd.DataFrame(index=years, columns=months)
+
+    arrays, slices = soa
+
+    if company_id not in slices:
+        return None
+
+    # Recortar las filas de la compañía: un slice contiguo de las columnas SoA
+    i0, i1 = slices[company_id]
+    
+    # Agregación año-mes con un solo bincount sobre claves (año, mes)
+    # aplanadas: evita el pase de hash+sort del groupby de pandas y el loop
+    # de relleno fila a fila
+    year_codes, years = pd.factorize(arrays['year'][i0:i1], sort=True)
+    months_arr = arrays['month'][i0:i1].astype(np.intp)
+    calls_arr = arrays['calls'][i0:i1]
+
+    data = np.bincount(year_codes * 12 + (months_arr - 1),
+                       weights=calls_arr,
+                       minlength=len(years) * 12).reshape(-1, 12)
+
+    if mode == "percentages":
+        year_totals = data.sum(axis=1, keepdims=True)
+        data = np.divide(data * 100.0, year_totals,
+                         out=np.zeros_like(data), where=year_totals > 0)
+
+    annual_table = pd.DataFrame(data, index=years, columns=list(range(1, 13)))
     annual_table.columns.name = 'Month'
     annual_table.index.name = 'Year'
-    
-    # Calcular datos para cada año
-    for year in years:
-        year_data = yearly_monthly[yearly_monthly['year'] == year]
-        year_total = year_data['calls'].sum()
-        
-        for month in months:
-            month_data = year_data[year_data['month'] == month]
-            if not month_data.empty:
-                month_calls = month_data['calls'].iloc[0]
-                if mode == "percentages":
-                    value = (month_calls / year_total) * 100
-                else:  # absolute
-                    value = month_calls
-                annual_table.loc[year, month] = value
-            else:
-                annual_table.loc[year, month] = 0.0
-    
+
     return annual_table
 
+@st.cache_data(ttl=3600)  # Cache por 1 hora (3600 segundos)
 def create_annual_table(annual_table, historical_data=None, mode="percentages"):
     """
     Crea una tabla formateada para mostrar datos anuales.
@@ -403,8 +733,7 @@ def create_annual_table(annual_table, historical_data=None, mode="percentages"):
         return None
     
     # Crear tabla con nombres de meses
-    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    month_names = list(MONTH_NAMES_SHORT)
     
     # Crear DataFrame formateado
     formatted_table = annual_table.copy()
@@ -443,23 +772,26 @@ def create_scatter_with_midpoints(annual_table, midpoint_lines, company_id, comp
     
     # Preparar datos para dispersión
     scatter_data = []
-    colors = []
-    labels = []
-    
+    years_points = []
+
     # Recopilar todos los puntos de datos anuales
     for year in annual_table.index:
         for month in annual_table.columns:
             value = annual_table.loc[year, month]
             if value > 0:  # Solo datos no cero
                 scatter_data.append([month, value])
-                colors.append(f'C{year % 10}')  # Color diferente por año
-                labels.append(f'{year}')
-    
+                years_points.append(year)
+
     # Convertir a arrays
     scatter_data = np.array(scatter_data)
     if len(scatter_data) == 0:
         return None
-    
+
+    # Color diferente por año: una indexación sobre la paleta precalculada
+    years_arr = np.asarray(years_points, dtype=np.int64)
+    colors = _PALETTE[years_arr % 10]
+    labels = [f'{year}' for year in years_points]
+
     months_scatter = scatter_data[:, 0]
     values_scatter = scatter_data[:, 1]
     
@@ -483,8 +815,7 @@ def create_scatter_with_midpoints(annual_table, midpoint_lines, company_id, comp
     ax.set_xlabel('Month', fontsize=12)
     ax.set_ylabel('Percentage of Total Calls (%)', fontsize=12)
     ax.set_xticks(range(1, 13))
-    ax.set_xticklabels(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                        'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+    ax.set_xticklabels(MONTH_NAMES_SHORT)
     
     # Crear leyenda personalizada
     legend_elements = []
@@ -588,41 +919,67 @@ def calculate_midpoint_lines(months, calls, peaks, valleys):
                 'is_circular': False
             })
     
-    # Verificar secuencia circular (diciembre→enero) solo si es válida
-    if len(all_points) > 1:
+    # Verificar secuencia circular (diciembre→enero): como solo hay dos tipos,
+    # la secuencia es válida exactamente cuando primer y último punto difieren.
+    # Un solo booleano tras el sort en lugar de condicionales anidados.
+    is_circular = len(all_points) > 1 and all_points[0]['type'] != all_points[-1]['type']
+
+    if is_circular:
         first_point = all_points[0]
         last_point = all_points[-1]
-        
-        # Solo si hay una secuencia válida (valley→peak o peak→valley)
-        if (last_point['type'] == 'valley' and first_point['type'] == 'peak') or \
-           (last_point['type'] == 'peak' and first_point['type'] == 'valley'):
-            
-            circular_midpoint = 0.5
-            circular_value = (last_point['value'] + first_point['value']) / 2
-            
-            if last_point['type'] == 'valley' and first_point['type'] == 'peak':
-                color = 'green'  # Subiendo: valley→peak
-            else:
-                color = 'red'    # Bajando: peak→valley
-            
-            midpoint_lines.append({
-                'month': circular_midpoint,
-                'value': circular_value,
-                'color': color,
-                'from_position': last_point['position'],
-                'to_position': first_point['position'],
-                'transition_type': f"{last_point['position']}→{first_point['position']}",
-                'is_circular': True
-            })
+
+        circular_midpoint = 0.5
+        circular_value = (last_point['value'] + first_point['value']) / 2
+
+        # Subiendo (valley→peak) verde, bajando (peak→valley) rojo
+        color = 'green' if last_point['type'] == 'valley' else 'red'
+
+        midpoint_lines.append({
+            'month': circular_midpoint,
+            'value': circular_value,
+            'color': color,
+            'from_position': last_point['position'],
+            'to_position': first_point['position'],
+            'transition_type': f"{last_point['position']}→{first_point['position']}",
+            'is_circular': True
+        })
     
     return midpoint_lines
 
+@st.cache_data(hash_funcs={np.ndarray: lambda a: a.tobytes()})
+def _smooth_curve(months, calls):
+    """
+    Evalúa el spline cúbico de suavizado una sola vez por serie.
+
+    El solve de SciPy es el mayor costo no-matplotlib del gráfico; cachearlo
+    por contenido del array evita repetirlo en cada rerun. SciPy se importa
+    aquí (su único uso) para no pagar su import en el arranque de cada worker.
+    """
+    from scipy.interpolate import make_interp_spline
+
+    x_smooth = np.linspace(months.min(), months.max(), 100)
+    spl = make_interp_spline(months, calls, k=3)
+    return x_smooth, spl(x_smooth)
+
+@st.cache_resource(max_entries=32, hash_funcs={np.ndarray: lambda a: a.tobytes()})
+def cached_inflection_chart(company_id, months, calls, peaks, valleys, company_name, ylabel_text, title_suffix, analysis_mode):
+    """
+    Figura del gráfico de inflexión cacheada por compañía y contenido de datos.
+
+    Reruns que repiten la misma selección reutilizan la figura ya dibujada en
+    lugar de reconstruirla; max_entries acota cuántas figuras quedan vivas.
+    """
+    return create_inflection_chart(months, calls, peaks, valleys, company_id, company_name, ylabel_text, title_suffix, analysis_mode)
+
 def create_inflection_chart(months, calls, peaks, valleys, company_id, company_name, ylabel_text="Percentage of Total Calls (%)", title_suffix="Peaks and Valleys Analysis", analysis_mode="Percentages"):
     """
     Crea el gráfico de puntos de inflexión para Streamlit
     """
-    # Crear figura
-    fig, ax = plt.subplots(figsize=(12, 8))
+    # Crear figura directamente (sin pyplot): cada entrada del cache conserva
+    # la suya y ninguna queda registrada en el gestor global de figuras, así
+    # las entradas desalojadas del cache se liberan con el garbage collector
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
     
     # Colores estándar
     line_color = 'blue'
@@ -635,11 +992,10 @@ def create_inflection_chart(months, calls, peaks, valleys, company_id, company_n
     peak_text = 'darkgreen'
     valley_text = 'darkred'
     
-    # Línea suave
-    if len(months) > 3:
-        x_smooth = np.linspace(months.min(), months.max(), 100)
-        spl = make_interp_spline(months, calls, k=3)
-        y_smooth = spl(x_smooth)
+    # Línea suave (solo si hay variación real: en series planas el spline
+    # resuelve un sistema lineal para producir lo mismo que la línea cruda)
+    if len(months) > 3 and np.ptp(calls) > np.max(calls) * 1e-4:
+        x_smooth, y_smooth = _smooth_curve(months, calls)
         ax.plot(x_smooth, y_smooth, '-', color=line_color, linewidth=3, alpha=0.8)
     
     # Datos originales
@@ -698,7 +1054,7 @@ def create_inflection_chart(months, calls, peaks, valleys, company_id, company_n
             ax.annotate(value_text, xy=(months[peak], calls[peak]), 
                        xytext=(0, -15), textcoords='offset points',
                        ha='center', va='top', fontsize=10, fontweight='bold', color='darkgreen',
-                       bbox=dict(boxstyle='round,pad=0.4', facecolor='lightgreen', alpha=0.8, edgecolor='darkgreen', linewidth=1.5))
+                       bbox=_PEAK_BBOX)
     
     if len(valleys) > 0:
         ax.plot(months[valleys], calls[valleys], 'v', color='red', markersize=8,
@@ -714,7 +1070,7 @@ def create_inflection_chart(months, calls, peaks, valleys, company_id, company_n
             ax.annotate(value_text, xy=(months[valley], calls[valley]), 
                        xytext=(0, 15), textcoords='offset points',
                        ha='center', va='bottom', fontsize=10, fontweight='bold', color='darkred',
-                       bbox=dict(boxstyle='round,pad=0.4', facecolor='lightcoral', alpha=0.8, edgecolor='darkred', linewidth=1.5))
+                       bbox=_VALLEY_BBOX)
     
     # Configurar gráfico con texto más pequeño
     ax.set_title(f'Inflection Points - {company_name} (ID: {company_id})\n{title_suffix} in Calls', 
@@ -722,21 +1078,223 @@ def create_inflection_chart(months, calls, peaks, valleys, company_id, company_n
     ax.set_xlabel('Month', fontsize=10)
     ax.set_ylabel(ylabel_text, fontsize=10)
     ax.set_xticks(range(1, 13))
-    ax.set_xticklabels(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                        'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], fontsize=9)
+    ax.set_xticklabels(MONTH_NAMES_SHORT, fontsize=9)
     ax.tick_params(axis='y', labelsize=9)
     ax.legend(fontsize=9)
     
     # Grid más sutil
     ax.grid(True, alpha=0.15, linestyle='--', linewidth=0.5)
-    
-    plt.tight_layout()
+
+    fig.tight_layout()
     return fig
 
 # =============================================================================
 # INTERFAZ DE STREAMLIT
 # =============================================================================
 
+@st.fragment
+def render_analysis(PROJECT, company_id, company_name, analysis_mode):
+    """
+    Sección de análisis: gráfico, tabla mensual y tabla anual.
+
+    Como fragmento de Streamlit, sus reruns internos no vuelven a ejecutar
+    main() completo (carga de datos, sidebar, etc.).
+    """
+    # Método híbrido como predeterminado
+    detection_method = "Hybrid (3-4 months)"
+
+    # Realizar análisis
+    months, calls, peaks, valleys, total_calls, monthly_calls = analyze_inflection_points_streamlit(PROJECT, company_id, detection_method)
+
+    if months is None:
+        st.error(f"{_('No data found for company')} {company_id}")
+        return
+
+    # Ajustar datos según el modo seleccionado
+    if analysis_mode == "Absolute":
+        # Convertir porcentajes a números absolutos para el gráfico
+        calls_absolute = (calls / 100) * total_calls
+        ylabel_text = 'Number of Calls'
+        title_suffix = 'Calls Analysis'
+    else:
+        calls_absolute = calls
+        ylabel_text = 'Percentage of Total Calls (%)'
+        title_suffix = 'Percentage Analysis'
+
+    # Máscaras booleanas de picos/valles: asignación directa por índice
+    # (más barata que np.isin, que compara 12 x len(peaks) pares),
+    # compartidas por la tabla mensual y los resúmenes
+    peak_mask = np.zeros(12, dtype=bool)
+    peak_mask[peaks] = True
+    valley_mask = np.zeros(12, dtype=bool)
+    valley_mask[valleys] = True
+
+    # Información compacta antes del gráfico: un solo componente en
+    # lugar de cuatro columnas con caption (un solo mensaje al frontend
+    # y menos nodos que reconciliar por rerun)
+    st.caption(
+        f"📊 {len(peaks)} Peaks · 📉 {len(valleys)} Valleys · "
+        f"📈 Avg: {np.mean(calls):.2f}% · 📅 12 months"
+    )
+
+    # Crear gráfico (cacheado por compañía + datos)
+    fig = cached_inflection_chart(company_id, months, calls_absolute, peaks, valleys, company_name, ylabel_text, title_suffix, analysis_mode)
+
+    # Mostrar gráfico
+    st.pyplot(fig)
+
+    month_names = get_month_names(get_current_lang())
+    unit = '%' if analysis_mode == "Percentages" else ''
+
+    # Detalle de picos y valles: un solo markdown multilínea por columna
+    # (un st.write por punto sería una actualización de componente cada uno)
+    col_peaks, col_valleys = st.columns(2)
+    with col_peaks:
+        st.markdown(f"**🟢 {_('Peaks')}**")
+        st.markdown("  \n".join(
+            f"**{i}.** {month_names[p]}: {calls_absolute[p]:.1f}{unit}"
+            for i, p in enumerate(peaks, 1)) or "—")
+    with col_valleys:
+        st.markdown(f"**🔴 {_('Valleys')}**")
+        st.markdown("  \n".join(
+            f"**{i}.** {month_names[v]}: {calls_absolute[v]:.1f}{unit}"
+            for i, v in enumerate(valleys, 1)) or "—")
+
+    # Tabla de datos mensuales
+    st.markdown(f"### {_('Monthly Data')}")
+
+    # Marcas de pico/valle a partir de las máscaras compartidas
+    peak_marks = np.where(peak_mask, '✅', '')
+    valley_marks = np.where(valley_mask, '✅', '')
+
+    # Una sola construcción: ambos modos comparten todas las columnas
+    # salvo el porcentaje. Tabla pyarrow directa: st.dataframe la envía
+    # tal cual y se ahorra la serialización pandas->Arrow por rerun
+    monthly_columns = {
+        _('Month'): month_names,
+        _('Calls'): monthly_calls.astype(np.int64)
+    }
+    if analysis_mode == "Percentages":
+        monthly_columns[_('Percentage (%)')] = calls.round(2)
+    monthly_columns[_('Is Peak')] = peak_marks
+    monthly_columns[_('Is Valley')] = valley_marks
+
+    monthly_data = pa.table(monthly_columns)
+
+    st.dataframe(monthly_data, use_container_width=True, height=490)
+
+    # Tabla de datos anuales
+    st.markdown(f"### {_('Annual Data')}")
+
+    # Calcular tabla de datos anuales
+    mode_key = "percentages" if analysis_mode == "Percentages" else "absolute"
+    annual_table = calculate_annual_data(PROJECT, company_id, mode_key)
+
+    # Preparar datos históricos según el modo
+    if analysis_mode == "Percentages":
+        historical_data = calls  # Porcentajes históricos
+    else:
+        # Calcular números absolutos históricos
+        historical_data = (calls / 100) * total_calls  # Convertir % a números absolutos
+
+    formatted_annual_table = create_annual_table(annual_table, historical_data, mode_key)
+
+    if formatted_annual_table is not None:
+        # Aplicar estilo a la tabla
+        def highlight_max_min(df):
+            """Resaltar máximos y mínimos por fila (excluyendo ceros) en una sola pasada 2D"""
+            values = df.to_numpy(dtype=float)
+            non_zero = np.where(values > 0, values, np.nan)
+            row_max = np.nanmax(non_zero, axis=1, keepdims=True)
+            row_min = np.nanmin(non_zero, axis=1, keepdims=True)
+
+            # El máximo se asigna al final para que gane sobre el mínimo
+            # cuando coinciden (fila con un solo valor no cero), igual que
+            # la cadena elif por fila original
+            styles = np.full(values.shape, '', dtype=object)
+            styles[values == 0] = 'background-color: #D3D3D3'      # Gris para ceros
+            styles[values == row_min] = 'background-color: #FFB6C1'  # Rosa claro para mínimo (no cero)
+            styles[values == row_max] = 'background-color: #90EE90'  # Verde claro para máximo (no cero)
+            return pd.DataFrame(styles, index=df.index, columns=df.columns)
+
+        def highlight_historical_row(row):
+            """Resaltar la fila histórica con color diferente"""
+            if row.name == 'Historical Total':
+                return ['background-color: #E6E6FA' for _ in row]  # Lavanda para fila histórica
+            return ['' for _ in row]
+
+        # Aplicar estilos y mostrar tabla
+        if mode_key == "percentages":
+            styled_table = (formatted_annual_table
+                          .style
+                          .format("{:.2f}")  # 2 decimales para porcentajes
+                          .apply(highlight_max_min, axis=None)
+                          .apply(highlight_historical_row, axis=1)
+                          .set_table_styles([
+                              {'selector': 'th', 'props': [('text-align', 'center')]},
+                              {'selector': 'td', 'props': [('text-align', 'center')]}
+                          ]))
+        else:  # absolute
+            styled_table = (formatted_annual_table
+                          .style
+                          .format("{:.0f}")  # Enteros para cantidades
+                          .apply(highlight_max_min, axis=None)
+                          .apply(highlight_historical_row, axis=1)
+                          .set_table_styles([
+                              {'selector': 'th', 'props': [('text-align', 'center')]},
+                              {'selector': 'td', 'props': [('text-align', 'center')]}
+                          ]))
+        # Una sola materialización numpy de la tabla anual alimenta la
+        # altura, la variación anual y el mes más activo
+        values = annual_table.to_numpy(dtype=float)
+        non_zero = np.where(values > 0, values, np.nan)
+        n_years = values.shape[0]
+
+        # Calcular altura dinámica: ~35px por fila (años + fila
+        # histórica) + 35px header
+        table_height = (n_years + 2) * 35 + 3
+        st.dataframe(styled_table, use_container_width=True, height=table_height)
+
+        # Variación por año (max-min de los meses no cero) calculada en
+        # una sola pasada 2D sobre el buffer numpy, sin loop por fila
+        variations = np.nanmax(non_zero, axis=1) - np.nanmin(non_zero, axis=1)
+        if not np.isnan(variations).all():
+            unit = "%" if mode_key == "percentages" else ""
+            st.caption(f"📊 {_('Average yearly variation (max-min)')}: {np.nanmean(variations):,.2f}{unit}")
+
+        most_active_month = formatted_annual_table.columns[values.mean(axis=0).argmax()]
+        st.caption(f"📅 {_('Most active month')}: {most_active_month} · {n_years} {_('years of data')}")
+
+        # Gráfico de dispersión con líneas de punto medio (COMENTADO TEMPORALMENTE)
+        # st.markdown("---")
+        # st.markdown(f"### 🎯 {_('Annual Data vs Historical Transitions')}")
+        # st.markdown(f"*{_('Scatter plot showing yearly data points with historical transition lines from main chart')}*")
+
+        # # Calcular líneas de punto medio para el gráfico de dispersión
+        # scatter_midpoint_lines = calculate_midpoint_lines(months, calls, peaks, valleys)
+
+        # # Crear gráfico de dispersión
+        # scatter_fig = create_scatter_with_midpoints(annual_table, scatter_midpoint_lines, company_id, company_name)
+        # if scatter_fig is not None:
+        #     st.pyplot(scatter_fig)
+
+        #     # Análisis de patrones
+        #     st.markdown("#### 🔍 {_('Pattern Analysis')}")
+        #     if scatter_midpoint_lines:
+        #         st.markdown("**{_('Historical Transition Lines:')}**")
+        #         for line in scatter_midpoint_lines:
+        #             if line['is_circular']:
+        #                 st.write(f"• **Year-End Transition**: December → January ({line['color'].title()})")
+        #             else:
+        #                 month_name = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+        #                             'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'][int(line['month'])-1]
+        #                 transition_type = "Valley→Peak" if line['color'] == 'green' else "Peak→Valley"
+        #                 st.write(f"• **Month {int(line['month'])} ({month_name})**: {transition_type} transition ({line['color'].title()})")
+        # else:
+        #     st.warning(_("No scatter plot data available"))
+    else:
+        st.warning(_("No annual data available for this company"))
+
 def main():
     # Título principal
     st.markdown(f"## {_('ServiceTitan - Inflection Points Analysis')}")
@@ -753,28 +1311,28 @@ def main():
     # Cargar datos con el proyecto seleccionado
     with st.spinner(_("Loading data from BigQuery...")):
         calls_df = get_calls_info(PROJECT=PROJECT)
-    
-    if calls_df is None:
+        company_index = build_company_index(PROJECT=PROJECT)
+
+    if calls_df is None or company_index is None:
         st.error(_("Error loading data. Check BigQuery connection."))
         return
     
-    # Obtener lista de compañías disponibles con nombres
-    companies_info = calls_df[['company_id', 'company_name']].drop_duplicates().sort_values('company_id')
-    companies_dict = dict(zip(companies_info['company_id'], companies_info['company_name']))
+    # Obtener lista de compañías disponibles con nombres (cacheada)
+    companies_dict = get_companies(PROJECT=PROJECT)
     
     # Panel de control
     with st.sidebar:
         st.markdown(f"**{_('Control Panel')}**")
         
-        # Selector de compañía
-        selected_company_name = st.selectbox(
+        # Selector de compañía: el widget devuelve directamente el ID y
+        # format_func muestra el nombre (sin escaneo inverso del dict por rerun)
+        company_id = st.selectbox(
             _("Company"),
-            options=list(companies_dict.values()),
+            options=list(companies_dict.keys()),
+            format_func=lambda cid: companies_dict[cid],
             index=0
         )
-        
-        # Obtener el ID de la compañía seleccionada
-        company_id = [k for k, v in companies_dict.items() if v == selected_company_name][0]
+        selected_company_name = companies_dict[company_id]
         
         # Selector de modo de análisis
         analysis_mode = st.selectbox(
@@ -785,168 +1343,11 @@ def main():
         
         st.markdown("---")
         
-        # Información compacta de la compañía
-        company_data = calls_df[calls_df['company_id'] == company_id]
-        total_calls_company = company_data['calls'].sum()
-        years_range = f"{company_data['year'].min()}-{company_data['year'].max()}"
-        
-        st.caption(f"📊 ID: {company_id}")
-        st.caption(f"📅 {years_range}")
-        st.caption(f"📞 {total_calls_company:,} calls")
-    
-    # Método híbrido como predeterminado
-    detection_method = "Hybrid (3-4 months)"
+        # Información compacta de la compañía: un solo markdown memoizado
+        st.caption(get_sidebar_company_info(PROJECT=PROJECT, company_id=company_id))
     
-    # Generar análisis automáticamente (sin botón)
-    if True:
-        # Realizar análisis
-        months, calls, peaks, valleys, total_calls, monthly_calls = analyze_inflection_points_streamlit(calls_df, company_id, detection_method)
-        
-        if months is not None:
-            # Ajustar datos según el modo seleccionado
-            if analysis_mode == "Absolute":
-                # Convertir porcentajes a números absolutos para el gráfico
-                calls_absolute = (calls / 100) * total_calls
-                ylabel_text = 'Number of Calls'
-                title_suffix = 'Calls Analysis'
-            else:
-                calls_absolute = calls
-                ylabel_text = 'Percentage of Total Calls (%)'
-                title_suffix = 'Percentage Analysis'
-            
-            # Información compacta antes del gráfico
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.caption(f"📊 {len(peaks)} Peaks")
-            with col2:
-                st.caption(f"📉 {len(valleys)} Valleys")
-            with col3:
-                st.caption(f"📈 Avg: {np.mean(calls):.2f}%")
-            with col4:
-                st.caption(f"📅 12 months")
-            
-            # Crear gráfico
-            fig = create_inflection_chart(months, calls_absolute, peaks, valleys, company_id, selected_company_name, ylabel_text, title_suffix, analysis_mode)
-            
-            # Mostrar gráfico
-            st.pyplot(fig)
-            
-            # Tabla de datos mensuales
-            st.markdown(f"### {_('Monthly Data')}")
-            if analysis_mode == "Percentages":
-                monthly_data = pd.DataFrame({
-                    _('Month'): [_("January"), _("February"), _("March"), _("April"), _("May"), _("June"),
-                                _("July"), _("August"), _("September"), _("October"), _("November"), _("December")],
-                    _('Calls'): monthly_calls.astype(int),
-                    _('Percentage (%)'): calls.round(2)
-                })
-            else:
-                monthly_data = pd.DataFrame({
-                    _('Month'): [_("January"), _("February"), _("March"), _("April"), _("May"), _("June"),
-                                _("July"), _("August"), _("September"), _("October"), _("November"), _("December")],
-                    _('Calls'): monthly_calls.astype(int)
-                })
-            
-            st.dataframe(monthly_data, use_container_width=True, height=490)
-            
-            # Tabla de datos anuales
-            st.markdown(f"### {_('Annual Data')}")
-            
-            # Calcular tabla de datos anuales
-            mode_key = "percentages" if analysis_mode == "Percentages" else "absolute"
-            annual_table = calculate_annual_data(calls_df, company_id, mode_key)
-            
-            # Preparar datos históricos según el modo
-            if analysis_mode == "Percentages":
-                historical_data = calls  # Porcentajes históricos
-            else:
-                # Calcular números absolutos históricos
-                historical_data = (calls / 100) * total_calls  # Convertir % a números absolutos
-            
-            formatted_annual_table = create_annual_table(annual_table, historical_data, mode_key)
-            
-            if formatted_annual_table is not None:
-                # Aplicar estilo a la tabla
-                def highlight_max_min(row):
-                    """Resaltar valores máximos y mínimos en cada fila (excluyendo ceros)"""
-                    styles = []
-                    # Filtrar valores no nulos y mayores a 0
-                    non_zero_values = row[row > 0]
-                    
-                    for i, val in enumerate(row):
-                        if val == 0:
-                            styles.append('background-color: #D3D3D3')  # Gris para ceros
-                        elif len(non_zero_values) > 0 and val == non_zero_values.max():
-                            styles.append('background-color: #90EE90')  # Verde claro para máximo (no cero)
-                        elif len(non_zero_values) > 0 and val == non_zero_values.min():
-                            styles.append('background-color: #FFB6C1')  # Rosa claro para mínimo (no cero)
-                        else:
-                            styles.append('')
-                    return styles
-                
-                def highlight_historical_row(row):
-                    """Resaltar la fila histórica con color diferente"""
-                    if row.name == 'Historical Total':
-                        return ['background-color: #E6E6FA' for _ in row]  # Lavanda para fila histórica
-                    return ['' for _ in row]
-                
-                # Aplicar estilos y mostrar tabla
-                if mode_key == "percentages":
-                    styled_table = (formatted_annual_table
-                                  .style
-                                  .format("{:.2f}")  # 2 decimales para porcentajes
-                                  .apply(highlight_max_min, axis=1)
-                                  .apply(highlight_historical_row, axis=1)
-                                  .set_table_styles([
-                                      {'selector': 'th', 'props': [('text-align', 'center')]},
-                                      {'selector': 'td', 'props': [('text-align', 'center')]}
-                                  ]))
-                else:  # absolute
-                    styled_table = (formatted_annual_table
-                                  .style
-                                  .format("{:.0f}")  # Enteros para cantidades
-                                  .apply(highlight_max_min, axis=1)
-                                  .apply(highlight_historical_row, axis=1)
-                                  .set_table_styles([
-                                      {'selector': 'th', 'props': [('text-align', 'center')]},
-                                      {'selector': 'td', 'props': [('text-align', 'center')]}
-                                  ]))
-                # Calcular altura dinámica: ~35px por fila + 35px header
-                table_height = (len(formatted_annual_table) + 1) * 35 + 3
-                st.dataframe(styled_table, use_container_width=True, height=table_height)
-                
-                # Gráfico de dispersión con líneas de punto medio (COMENTADO TEMPORALMENTE)
-                # st.markdown("---")
-                # st.markdown(f"### 🎯 {_('Annual Data vs Historical Transitions')}")
-                # st.markdown(f"*{_('Scatter plot showing yearly data points with historical transition lines from main chart')}*")
-                
-                # # Calcular líneas de punto medio para el gráfico de dispersión
-                # scatter_midpoint_lines = calculate_midpoint_lines(months, calls, peaks, valleys)
-                
-                # # Crear gráfico de dispersión
-                # scatter_fig = create_scatter_with_midpoints(annual_table, scatter_midpoint_lines, company_id, selected_company_name)
-                # if scatter_fig is not None:
-                #     st.pyplot(scatter_fig)
-                    
-                #     # Análisis de patrones
-                #     st.markdown("#### 🔍 {_('Pattern Analysis')}")
-                #     if scatter_midpoint_lines:
-                #         st.markdown("**{_('Historical Transition Lines:')}**")
-                #         for line in scatter_midpoint_lines:
-                #             if line['is_circular']:
-                #                 st.write(f"• **Year-End Transition**: December → January ({line['color'].title()})")
-                #             else:
-                #                 month_name = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                #                             'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'][int(line['month'])-1]
-                #                 transition_type = "Valley→Peak" if line['color'] == 'green' else "Peak→Valley"
-                #                 st.write(f"• **Month {int(line['month'])} ({month_name})**: {transition_type} transition ({line['color'].title()})")
-                # else:
-                #     st.warning(_("No scatter plot data available"))
-            else:
-                st.warning(_("No annual data available for this company"))
-            
-        else:
-            st.error(f"{_('No data found for company')} {company_id}")
+    # Sección de análisis (fragmento: sus reruns no repiten main())
+    render_analysis(PROJECT, company_id, selected_company_name, analysis_mode)
 
 if __name__ == "__main__":
     main()